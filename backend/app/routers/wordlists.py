@@ -26,8 +26,8 @@ from sqlmodel import Session, select
 from ..core.logging import get_logger
 from ..deps import get_current_user, get_db
 from ..models import User, Word, WordList
-from ..utils.parser import sniff_and_parse
-from ..services.agents import extract_vocabulary_from_image
+from ..utils.parser import iter_sniff_and_parse
+from ..services.agents import extract_vocabulary_from_image_async
 
 # Initialize logger for this module
 logger = get_logger(__name__)
@@ -124,7 +124,8 @@ async def upload_words(
     data = await file.read()
     logger.info(f"Uploading file '{file.filename}' ({len(data)} bytes) to wordlist {list_id}")
 
-    rows = sniff_and_parse(data, file.filename)
+    # 流式解析：逐条产出并加入会话，不把整个文件物化成列表
+    rows = iter_sniff_and_parse(data, file.filename)
     created = 0
     for r in rows:
         term = (r.get("term") or "").strip()
@@ -185,7 +186,7 @@ async def create_from_image(
     logger.info(f"Extracting words from image '{file.filename}' ({len(data)} bytes)")
 
     try:
-        rows = extract_vocabulary_from_image(data)
+        rows = await extract_vocabulary_from_image_async(data)
     except ImportError:
         logger.error(f"LLM provider not configured for image extraction")
         raise HTTPException(status_code=400, detail="LLM provider not configured. Install provider SDK and set env.")
@@ -298,7 +299,7 @@ async def preview_from_image(
     logger.info(f"Previewing word extraction from image '{file.filename}' ({len(data)} bytes)")
 
     try:
-        rows = extract_vocabulary_from_image(data)
+        rows = await extract_vocabulary_from_image_async(data)
     except ImportError:
         logger.error("LLM provider not configured for preview")
         raise HTTPException(status_code=400, detail="LLM provider not configured. Install provider SDK and set env.")
@@ -350,7 +351,7 @@ async def preview_upload(
         raise HTTPException(status_code=404, detail="Wordlist not found")
 
     data = await file.read()
-    rows = sniff_and_parse(data, file.filename)
+    rows = iter_sniff_and_parse(data, file.filename)
 
     # Return parsed words without saving
     result = []
@@ -435,8 +436,8 @@ async def _process_single_image(file_data: bytes, filename: str, index: int, tas
         batch_tasks[task_id]["current_index"] = index
         logger.debug(f"[Batch {task_id}] Processing image {index}: {filename}")
 
-        # 提取词汇
-        rows = await asyncio.to_thread(extract_vocabulary_from_image, file_data)
+        # 提取词汇（异步版本，不阻塞事件循环）
+        rows = await extract_vocabulary_from_image_async(file_data)
 
         # 处理结果
         result = []
@@ -0,0 +1,273 @@
+"""
+统一的 DashScope 响应文本提取
+
+images2words_agent 与 definition_judge_agent 此前各自维护一份近似的
+提取逻辑，每个响应最多要做约20次 getattr/dict.get 探测。这里合并为
+一个按常见响应形态排序的访问器表：依次尝试，首个命中即返回，常见
+形态只需一次访问链。
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, List, Tuple
+
+# 可选依赖：json_repair 能结构化修复LLM常见的JSON瑕疵
+# （尾逗号、未加引号的键、数组外的注释文本等）
+try:  # pragma: no cover - optional dependency
+    from json_repair import repair_json
+except Exception:  # pragma: no cover
+    repair_json = None  # type: ignore
+
+# 可选依赖：orjson 解析UTF-8负载比标准库快2-3倍
+# orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，异常处理不变
+try:  # pragma: no cover - optional dependency
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+def loads(text: str | bytes) -> Any:
+    """解析JSON，优先使用orjson。"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+# 单层属性形态用 getattr 默认值探测（无异常开销）；
+# 链式/字典形态才走 try/except 访问器表
+_SIMPLE_ATTRS_PRE: Tuple[str, ...] = ("output_text", "text")
+_SIMPLE_ATTRS_POST: Tuple[str, ...] = ("message", "content")
+
+# 访问器按实际出现频率排序；访问失败（形态不符）直接尝试下一个
+_ACCESSORS: Tuple[Callable[[Any], Any], ...] = (
+    # dashscope 属性形态（多模态 choices / 文本 Generation）
+    lambda r: r.output.choices[0].message.content,
+    lambda r: r.output.text,
+    # 字典形态
+    lambda r: r["output"]["choices"][0]["message"]["content"],
+    lambda r: r["output"]["text"],
+    lambda r: r["output"]["content"],
+    lambda r: r["choices"][0]["message"]["content"],
+    lambda r: r["text"],
+)
+
+
+def _coerce_text(value: Any) -> str | None:
+    """把访问器结果规整为非空文本；content 可能是 [{"text": ...}] 列表。"""
+    if isinstance(value, str):
+        stripped = value.strip()
+        return value if stripped else None
+    if isinstance(value, list):
+        for item in value:
+            if isinstance(item, dict):
+                text = item.get("text")
+                if isinstance(text, str) and text.strip():
+                    return text
+            elif isinstance(item, str) and item.strip():
+                return item
+    return None
+
+
+def extract_text(response: Any, default: str | None = None) -> str:
+    """从 DashScope 响应中提取文本内容。
+
+    无法识别（或文本为空）时回退 str(response)；流式消费方可传入
+    default=""，避免把空增量chunk的repr当作文本产出。
+    """
+    # dashscope 响应对象走快路径：形态固定，一次访问链即可命中，
+    # 无需逐个探测访问器表
+    if type(response).__module__.startswith("dashscope"):
+        try:
+            output = response.output
+            if output.text is not None:
+                return output.text
+            text = _coerce_text(output.choices[0].message.content)
+            if text is not None:
+                return text
+        except (AttributeError, KeyError, TypeError, IndexError):
+            pass
+    for name in _SIMPLE_ATTRS_PRE:
+        text = _coerce_text(getattr(response, name, None))
+        if text is not None:
+            return text
+    for accessor in _ACCESSORS:
+        try:
+            value = accessor(response)
+        except (AttributeError, KeyError, TypeError, IndexError):
+            continue
+        text = _coerce_text(value)
+        if text is not None:
+            return text
+    for name in _SIMPLE_ATTRS_POST:
+        text = _coerce_text(getattr(response, name, None))
+        if text is not None:
+            return text
+    return str(response) if default is None else default
+
+
+def strip_code_fences(text: str) -> str:
+    """去除包裹模型输出的 markdown 代码栅栏。
+
+    绝大多数带栅栏的输出就是字面的 ```json\\n...\\n```，用
+    removeprefix/removesuffix（C层实现）处理即可，无需正则引擎。
+    """
+    text = text.strip()
+    if not text.startswith("```"):
+        return text
+    body = text.removeprefix("```json").removeprefix("```").lstrip("\n")
+    return body.removesuffix("```").rstrip()
+
+
+class IncrementalArrayParser:
+    """跨流式 chunk 维护状态的 JSON 数组增量解析器。
+
+    每 feed 一段增量文本，返回本段中新闭合的顶层对象列表。
+    """
+
+    def __init__(self) -> None:
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._obj: List[str] = []
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        for ch in chunk:
+            if not self._in_array:
+                if ch == "[":
+                    self._in_array = True
+                    self._depth = 1
+                continue
+            if self._depth >= 2:
+                self._obj.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 2 and ch == "{":
+                    self._obj = ["{"]
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._obj:
+                    try:
+                        obj = json.loads("".join(self._obj))
+                    except json.JSONDecodeError:
+                        obj = None
+                    self._obj = []
+                    if isinstance(obj, dict):
+                        out.append(obj)
+                elif self._depth <= 0:
+                    self._in_array = False
+        return out
+
+
+def find_json_array(text: str) -> str | None:
+    """单趟扫描定位首个平衡的顶层JSON数组，返回其子串。
+
+    相比 find('[') + rfind(']') 再整体重解析的做法，这里用字符串感知
+    的括号深度状态机从左到右只扫一遍，数组前后夹杂说明文字时也能
+    精确切出平衡的 `[...]`；未找到闭合数组时返回 None。
+    """
+    start = text.find("[")
+    if start < 0:
+        return None
+    depth = 0
+    in_string = False
+    escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth <= 0:
+                return text[start:i + 1]
+    return None
+
+
+def salvage_json_array(text: str) -> List[Dict[str, Any]]:
+    """从整体解析失败的文本中抢救JSON数组元素。
+
+    优先用 json_repair 做结构化修复（若已安装）；否则从第一个 `[`
+    开始做字符串感知的括号扫描，逐个切出已闭合的顶层对象——截断、
+    前后夹杂说明文字等常见失败形态都能拿回完整的部分，且只扫一遍。
+    """
+    start = text.find("[")
+    if start < 0:
+        return []
+    payload = text[start:]
+
+    if repair_json is not None:
+        try:
+            data = json.loads(repair_json(payload))
+            if isinstance(data, list):
+                return [obj for obj in data if isinstance(obj, dict)]
+        except (json.JSONDecodeError, TypeError, ValueError):
+            pass
+
+    items: List[Dict[str, Any]] = []
+    depth = 0
+    in_string = False
+    escape = False
+    obj_start = -1
+    for i, ch in enumerate(payload):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch == "{":
+            if depth == 1:
+                obj_start = i
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 1 and obj_start >= 0:
+                try:
+                    obj = json.loads(payload[obj_start:i + 1])
+                except json.JSONDecodeError:
+                    obj = None
+                if isinstance(obj, dict):
+                    items.append(obj)
+                obj_start = -1
+        elif ch == "[":
+            depth += 1
+        elif ch == "]":
+            depth -= 1
+            if depth <= 0:
+                break
+    return items
+
+
+__all__ = [
+    "IncrementalArrayParser",
+    "extract_text",
+    "find_json_array",
+    "loads",
+    "salvage_json_array",
+    "strip_code_fences",
+]
@@ -0,0 +1,103 @@
+"""
+持久化单词释义存储（SQLite）
+
+进程内的补全缓存（LRU）重启即失效；这里提供一个轻量的 SQLite 字典，
+跨进程/跨重启复用已生成的释义与例句，避免为同一单词反复调用模型。
+
+所有操作均为尽力而为：存储不可用时静默降级为未命中/不写入，
+不影响主流程。
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# 数据库路径；设为空字符串可禁用持久化存储。默认锚定到 backend 目录
+# （本模块的上两级），与启动时的工作目录无关
+_DEFAULT_STORE_PATH = str(Path(__file__).resolve().parents[2] / "term_store.db")
+TERM_STORE_PATH = os.getenv("TERM_STORE_PATH", _DEFAULT_STORE_PATH)
+
+_conn: sqlite3.Connection | None = None
+_conn_failed = False
+_conn_lock = threading.Lock()
+
+
+def _get_conn() -> sqlite3.Connection | None:
+    """懒初始化共享连接（WAL模式，读写并发友好）；失败时返回 None。
+
+    初始化失败会被记住，只告警一次，后续调用直接降级为未命中，
+    不再重复尝试连接。
+    """
+    global _conn, _conn_failed
+    if not TERM_STORE_PATH or _conn_failed:
+        return None
+    if _conn is not None:
+        return _conn
+    with _conn_lock:
+        if _conn is None and not _conn_failed:
+            try:
+                conn = sqlite3.connect(TERM_STORE_PATH, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS terms("
+                    "term TEXT PRIMARY KEY, definition TEXT, example TEXT)"
+                )
+                conn.commit()
+                _conn = conn
+            except sqlite3.Error as e:
+                _conn_failed = True
+                logger.warning(f"[词条存储] 初始化失败，降级为不可用: {e}")
+                return None
+    return _conn
+
+
+def get_term(term: str) -> Optional[Dict[str, Any]]:
+    """按小写词条查询；未命中或存储不可用时返回 None。"""
+    conn = _get_conn()
+    if conn is None:
+        return None
+    try:
+        with _conn_lock:
+            row = conn.execute(
+                "SELECT definition, example FROM terms WHERE term = ?",
+                (term.lower(),),
+            ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"[词条存储] 查询失败: {e}")
+        return None
+    if row is None:
+        return None
+    return {"definition": row[0], "example": row[1]}
+
+
+def put_term(term: str, definition: Optional[str], example: Optional[str]) -> None:
+    """写入/更新词条；只保留非空字段，存储不可用时静默跳过。"""
+    if not (definition or example):
+        return
+    conn = _get_conn()
+    if conn is None:
+        return
+    try:
+        with _conn_lock:
+            conn.execute(
+                "INSERT INTO terms(term, definition, example) VALUES(?, ?, ?) "
+                "ON CONFLICT(term) DO UPDATE SET "
+                "definition = COALESCE(excluded.definition, definition), "
+                "example = COALESCE(excluded.example, example)",
+                (term.lower(), definition, example),
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        logger.warning(f"[词条存储] 写入失败: {e}")
+
+
+__all__ = ["get_term", "put_term"]
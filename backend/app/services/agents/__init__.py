@@ -4,11 +4,17 @@ Agents module
 Contains LangGraph-based agents for various tasks.
 """
 
-from .images2words_agent import extract_vocabulary_from_image
+from .images2words_agent import (
+    extract_vocabulary_from_image,
+    extract_vocabulary_from_image_async,
+    stream_vocabulary_from_image,
+)
 from .definition_judge_agent import judge_definitions, JudgeResult
 
 __all__ = [
     "extract_vocabulary_from_image",
+    "extract_vocabulary_from_image_async",
+    "stream_vocabulary_from_image",
     "judge_definitions",
     "JudgeResult",
 ]
@@ -22,15 +22,30 @@ Definition Similarity Judge Agent
 
 from __future__ import annotations
 
+import functools
+import io
 import json
 import logging
 import os
-import re
-from typing import Any, Dict, List, TypedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, TypedDict
 
 import dashscope
 
 from app.core.logging import get_logger
+from app.services._llm_response import IncrementalArrayParser as _IncrementalArrayParser
+from app.services._llm_response import extract_text as _extract_text_from_response
+from app.services._llm_response import find_json_array as _find_json_array
+from app.services._llm_response import loads as _json_loads
+from app.services._llm_response import salvage_json_array as _salvage_json_array
+from app.services._llm_response import strip_code_fences as _strip_code_fences
+
+# Optional streaming JSON parser for salvaging truncated model output.
+# 可选依赖：ijson 用于流式解析被截断的JSON数组
+try:  # pragma: no cover - optional dependency
+    import ijson  # type: ignore
+except Exception:  # pragma: no cover
+    ijson = None  # type: ignore
 
 # Optional LangSmith tracing (best-effort). Enable with env:
 #   LANGSMITH_ENABLED=1 and provide LANGSMITH_API_KEY or LANGCHAIN_API_KEY
@@ -44,9 +59,63 @@ except Exception:  # pragma: no cover - optional dependency
 _logger = get_logger(__name__)
 
 
+def _install_pooled_http_session() -> None:
+    """为 DashScope SDK 安装进程级共享 HTTP 连接池（尽力而为）。
+
+    SDK 在每次调用里 `with requests.Session() as session:` 新建并关闭
+    会话，导致每个请求都重新进行 TCP/TLS 握手（约 100-200ms）。这里把
+    该模块引用的 `requests.Session` 换成一个返回共享会话的代理，退出
+    `with` 时不关闭底层连接池，从而实现跨调用的连接复用。
+
+    SDK 内部结构随版本变化，任何失败都静默跳过（保持原行为）。
+    可通过环境变量 DASHSCOPE_HTTP_POOLING=0 关闭。
+    """
+    if (os.getenv("DASHSCOPE_HTTP_POOLING") or "1").strip().lower() in ("0", "false", "no"):
+        return
+    try:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from dashscope.api_entities import http_request as _ds_http  # type: ignore
+
+        shared = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        shared.mount("https://", adapter)
+        shared.mount("http://", adapter)
+
+        class _NonClosingSession:
+            """`with` 语义下返回共享会话且退出时不关闭。"""
+
+            def __enter__(self):
+                return shared
+
+            def __exit__(self, *exc):
+                return False
+
+        class _RequestsShim:
+            """仅覆写 Session，其余属性透传给真正的 requests 模块。"""
+
+            Session = staticmethod(_NonClosingSession)
+
+            def __getattr__(self, name):
+                return getattr(requests, name)
+
+        _ds_http.requests = _RequestsShim()
+        _logger.debug("[judge] installed pooled HTTP session for dashscope")
+    except Exception:  # pragma: no cover - best effort
+        pass
+
+
+_install_pooled_http_session()
+
+
 
 TEXT_MODEL = os.getenv("TEXT_MODEL", "qwen3-max-preview")
 
+# 单次评审 prompt 的安全 token 预算；超出时自动拆分批次
+MAX_PROMPT_TOKENS = int(os.getenv("JUDGE_MAX_PROMPT_TOKENS", "6000"))
+
+# 评分规则、输出说明等固定文本的 token 开销（估算值）
+_RULES_TOKEN_OVERHEAD = 900
 
 class JudgeResult(TypedDict, total=False):
     term: str
@@ -59,7 +128,12 @@ class JudgeResult(TypedDict, total=False):
     missing_keywords: List[str]
 
 
+@functools.cache
 def _ensure_api_key() -> None:
+    """读取并设置 API Key；值为进程常量，仅首次调用真正执行。
+
+    未设置时抛出的 ValueError 不会被缓存，配置好后重试即可生效。
+    """
     api_key = os.getenv("DASHSCOPE_API_KEY", "").strip()
     if not api_key:
         raise ValueError("请设置环境变量 DASHSCOPE_API_KEY")
@@ -70,71 +144,53 @@ def _ensure_api_key() -> None:
         pass
 
 
-def _extract_text_from_response(response: Any) -> str:
-    """与 images2words_agent 中逻辑一致的文本提取器（简化版）。"""
-    for attr in ("output_text", "text", "message", "content"):
+def _parse_json_array_prefix(text: str) -> List[Dict[str, Any]]:
+    """解析可能被截断的JSON数组，尽量抢救已完整输出的元素。
+
+    模型在触达 token 上限时经常在数组中途被截断，整体 `json.loads`
+    会直接失败。这里从第一个 `[` 开始做流式/增量解析，收集所有
+    已经闭合的顶层对象，丢弃末尾不完整的部分。
+    """
+    start = text.find("[")
+    if start < 0:
+        return []
+    payload = text[start:]
+
+    # 优先使用 ijson 的流式解析（若已安装）
+    if ijson is not None:
+        items: List[Dict[str, Any]] = []
         try:
-            v = getattr(response, attr, None)
-            if isinstance(v, str) and v.strip():
-                return v
+            for obj in ijson.items(io.BytesIO(payload.encode("utf-8")), "item"):
+                if isinstance(obj, dict):
+                    items.append(obj)
         except Exception:
+            # 截断处抛出 IncompleteJSONError，已收集的元素仍然有效
             pass
+        return items
 
-    try:
-        if hasattr(response, "output"):
-            output = response.output
-            text = getattr(output, "text", None)
-            if isinstance(text, str) and text.strip():
-                return text
-            choices = getattr(output, "choices", None)
-            if choices:
-                c0 = choices[0]
-                msg = getattr(c0, "message", None)
-                if msg is not None:
-                    content = getattr(msg, "content", None)
-                    if isinstance(content, list):
-                        for item in content:
-                            if isinstance(item, dict) and isinstance(item.get("text"), str):
-                                t = item["text"].strip()
-                                if t:
-                                    return t
-                    elif isinstance(content, str) and content.strip():
-                        return content
-    except Exception:
-        pass
+    # 回退：复用 _llm_response 里共享的括号扫描抢救逻辑
+    return _salvage_json_array(text)
 
-    try:
-        if isinstance(response, dict):
-            out = response.get("output") or {}
-            if isinstance(out, dict):
-                if isinstance(out.get("text"), str):
-                    return str(out["text"]).strip()
-                if isinstance(out.get("content"), str):
-                    return str(out["content"]).strip()
-                if out.get("choices"):
-                    c0 = out["choices"][0]
-                    if isinstance(c0, dict):
-                        message = c0.get("message") or {}
-                        content = message.get("content")
-                        if isinstance(content, list):
-                            for item in content:
-                                if isinstance(item, dict) and isinstance(item.get("text"), str):
-                                    t = item["text"].strip()
-                                    if t:
-                                        return t
-                        elif isinstance(content, str) and content.strip():
-                            return content
-            if response.get("choices"):
-                c0 = response["choices"][0]
-                if isinstance(c0, dict):
-                    message = c0.get("message") or {}
-                    content = message.get("content")
-                    if isinstance(content, str) and content.strip():
-                        return content
-    except Exception:
-        pass
 
-    return str(response)
+def _s(d: Dict[str, Any], key: str) -> str:
+    """取字符串字段：一次类型判断 + strip，替代逐字段的 isinstance 链。"""
+    v = d.get(key)
+    if isinstance(v, str):
+        return v.strip()
+    return "" if v is None else str(v)
+
+
+def _b(d: Dict[str, Any], key: str) -> bool:
+    """取布尔字段。"""
+    return bool(d.get(key))
+
+
+def _f(d: Dict[str, Any], key: str, default: float) -> float:
+    """取数值字段，转换失败时回退默认值。"""
+    try:
+        return float(d.get(key, default))
+    except (TypeError, ValueError):
+        return default
 
 
 def _normalize_inputs(
@@ -183,6 +239,39 @@ def _normalize_inputs(
     return merged
 
 
+def _estimate_item_tokens(item: Dict[str, str]) -> int:
+    """粗略估算单条评估数据占用的 prompt token 数。
+
+    使用 字符数/4 的启发式（无需引入 tokenizer 依赖），再加上 JSON
+    结构与键名的固定开销。偏保守即可，目的只是避免整体超出上下文。
+    """
+    chars = (
+        len(item.get("term", ""))
+        + len(item.get("reference_definition", ""))
+        + len(item.get("user_answer", ""))
+    )
+    return chars // 4 + 40
+
+
+def _split_batches(items: List[Dict[str, str]]) -> List[List[Dict[str, str]]]:
+    """按 token 预算贪心打包评估条目，保证每批 prompt 不超限。"""
+    budget = max(MAX_PROMPT_TOKENS - _RULES_TOKEN_OVERHEAD, 500)
+    batches: List[List[Dict[str, str]]] = []
+    current: List[Dict[str, str]] = []
+    current_tokens = 0
+    for item in items:
+        cost = _estimate_item_tokens(item)
+        if current and current_tokens + cost > budget:
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(item)
+        current_tokens += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
 def _build_prompt(items: List[Dict[str, str]], strictness: str = "medium", language: str = "zh") -> str:
     # 评分与判定标准（中文）
     strictness = (strictness or "medium").lower()
@@ -227,6 +316,100 @@ def _build_prompt(items: List[Dict[str, str]], strictness: str = "medium", langu
     )
 
 
+def ijudge_definitions(
+    word_items: List[Dict[str, Any]],
+    user_answers: Dict[str, str] | List[Dict[str, Any]],
+    *,
+    strictness: str = "medium",
+    language: str = "zh",
+) -> Iterator[JudgeResult]:
+    """流式评审：边接收模型输出边产出 JudgeResult。
+
+    使用 DashScope 流式接口（stream=True, incremental_output=True），
+    每当数组中一个顶层对象闭合就立即解析并 yield，调用方（如 SSE
+    推送）无需等待整个响应结束。批量等价形式：
+    `list(ijudge_definitions(...))`。
+
+    注意：与 judge_definitions 不同，无法解析的条目不会补充保底结果。
+    """
+    _ensure_api_key()
+    items = _normalize_inputs(word_items, user_answers)
+    if not items:
+        return
+
+    prompt = _build_prompt(items, strictness=strictness, language=language)
+    _logger.info("[judge] streaming items=%d strictness=%s", len(items), strictness)
+
+    responses = dashscope.Generation.call(
+        model=TEXT_MODEL,
+        prompt=prompt,
+        stream=True,
+        incremental_output=True,
+    )
+
+    parser = _IncrementalArrayParser()
+    for response in responses:
+        try:
+            delta = response.output.text
+        except AttributeError:
+            try:
+                delta = response["output"]["text"]
+            except Exception:
+                delta = None
+        if not isinstance(delta, str) or not delta:
+            continue
+        for it in parser.feed(delta):
+            term = _s(it, "term")
+            if not term:
+                continue
+            is_match = _b(it, "is_match")
+            mk = it.get("missing_keywords")
+            yield JudgeResult(
+                term=term,
+                reference_definition=_s(it, "reference_definition"),
+                user_answer=_s(it, "user_answer"),
+                is_match=is_match,
+                score=_f(it, "score", 1.0 if is_match else 0.0),
+                verdict=_s(it, "verdict") or ("correct" if is_match else "incorrect"),
+                reason=_s(it, "reason"),
+                missing_keywords=[str(x) for x in mk] if isinstance(mk, list) else [],
+            )
+
+
+def _call_and_parse(
+    batch: List[Dict[str, str]],
+    *,
+    strictness: str = "medium",
+    language: str = "zh",
+) -> List[Dict[str, Any]]:
+    """对单个批次发起评审调用并解析返回的JSON数组。"""
+    prompt = _build_prompt(batch, strictness=strictness, language=language)
+    if _logger.isEnabledFor(logging.DEBUG):
+        _logger.debug(f"[judge] prompt preview (first 600 chars):\n{prompt[:600]}")
+
+    response = dashscope.Generation.call(
+        model=TEXT_MODEL,
+        prompt=prompt,
+    )
+
+    text = _extract_text_from_response(response).strip()
+    if _logger.isEnabledFor(logging.DEBUG):
+        _logger.debug(f"[judge] raw text head: {text[:300]}")
+    # 前后缀切片去栅栏（C层实现），无需正则全文扫描
+    text = _strip_code_fences(text)
+
+    # 单趟扫描切出平衡的数组子串后只解析一次；orjson 可用时优先
+    blob = _find_json_array(text)
+    try:
+        parsed = _json_loads(blob if blob is not None else text)
+        if isinstance(parsed, list):
+            return parsed
+    except json.JSONDecodeError:
+        # 整体解析失败（常见于输出被截断），抢救已完整的元素
+        return _parse_json_array_prefix(text)
+    return []
+
+
 def judge_definitions(
     word_items: List[Dict[str, Any]],
     user_answers: Dict[str, str] | List[Dict[str, Any]],
@@ -244,10 +427,12 @@ def judge_definitions(
     if not items:
         return []
 
-    prompt = _build_prompt(items, strictness=strictness, language=language)
-    _logger.info(f"[judge] items={len(items)} strictness={strictness} lang={language}")
-    if _logger.isEnabledFor(logging.DEBUG):
-        _logger.debug(f"[judge] prompt preview (first 600 chars):\n{prompt[:600]}")
+    # 按 token 预算拆分批次，避免超长 prompt 溢出上下文
+    batches = _split_batches(items)
+    _logger.info(
+        "[judge] items=%d batches=%d strictness=%s lang=%s",
+        len(items), len(batches), strictness, language,
+    )
 
     # Determine if LangSmith tracing is enabled via env flags
     def _truthy(name: str) -> bool:
@@ -267,69 +452,47 @@ def judge_definitions(
             _logger.debug("[judge] LangSmith tracing enabled")
         ctx = _trace_cm if _trace_cm is not None else nullcontext()  # type: ignore
         with ctx as _run:
-            response = dashscope.Generation.call(
-                model=TEXT_MODEL,
-                prompt=prompt,
-            )
-
-        text = _extract_text_from_response(response).strip()
-        if _logger.isEnabledFor(logging.DEBUG):
-            _logger.debug(f"[judge] raw text head: {text[:300]}")
-        if text.startswith("```"):
-            text = re.sub(r"^```(?:json)?\n?", "", text, flags=re.MULTILINE)
-            text = re.sub(r"```$", "", text, flags=re.MULTILINE)
-        text = text.strip()
-
-        data: List[Dict[str, Any]] = []
-        try:
-            parsed = json.loads(text)
-            if isinstance(parsed, list):
-                data = parsed
-        except json.JSONDecodeError:
-            m = re.search(r"\[[\s\S]*\]", text)
-            if m:
-                try:
-                    data = json.loads(m.group())
-                except json.JSONDecodeError:
-                    data = []
+            if len(batches) == 1:
+                data = _call_and_parse(batches[0], strictness=strictness, language=language)
+            else:
+                # 多批次时并发派发，整体耗时约等于最慢一批
+                with ThreadPoolExecutor(max_workers=min(4, len(batches))) as ex:
+                    data = [
+                        item
+                        for batch_data in ex.map(
+                            lambda b: _call_and_parse(b, strictness=strictness, language=language),
+                            batches,
+                        )
+                        for item in batch_data
+                    ]
 
         results: List[JudgeResult] = []
         for it in data:
             if not isinstance(it, dict):
                 continue
-            term = str((it.get("term") or "")).strip()
-            ref_def = (it.get("reference_definition") or "") if isinstance(it.get("reference_definition"), str) else str(it.get("reference_definition", ""))
-            ans = (it.get("user_answer") or "") if isinstance(it.get("user_answer"), str) else str(it.get("user_answer", ""))
-            is_match = bool(it.get("is_match"))
-            verdict = str((it.get("verdict") or "")).strip() or ("correct" if is_match else "incorrect")
-            try:
-                score_val = float(it.get("score", 1.0 if is_match else 0.0))
-            except Exception:
-                score_val = 1.0 if is_match else 0.0
-            reason = str((it.get("reason") or "")).strip()
+            term = _s(it, "term")
+            if not term:
+                continue
+            is_match = _b(it, "is_match")
             mk = it.get("missing_keywords")
-            if isinstance(mk, list):
-                missing_keywords = [str(x) for x in mk]
-            else:
-                missing_keywords = []
-
-            if term:
-                results.append(
-                    JudgeResult(
-                        term=term,
-                        reference_definition=ref_def,
-                        user_answer=ans,
-                        is_match=is_match,
-                        score=score_val,
-                        verdict=verdict,
-                        reason=reason,
-                        missing_keywords=missing_keywords,
-                    )
+            results.append(
+                JudgeResult(
+                    term=term,
+                    reference_definition=_s(it, "reference_definition"),
+                    user_answer=_s(it, "user_answer"),
+                    is_match=is_match,
+                    score=_f(it, "score", 1.0 if is_match else 0.0),
+                    verdict=_s(it, "verdict") or ("correct" if is_match else "incorrect"),
+                    reason=_s(it, "reason"),
+                    missing_keywords=[str(x) for x in mk] if isinstance(mk, list) else [],
                 )
+            )
 
-        # 若模型返回为空，构造一个保底结果（全部 incorrect）
-        if not results:
-            for it in items:
+        # 对未能从模型输出中解析到的条目构造保底结果（incorrect）；
+        # 输出被截断时仍可保留已成功解析的部分
+        parsed_terms = {r.get("term", "") for r in results}
+        for it in items:
+            if it.get("term", "") not in parsed_terms:
                 results.append(
                     JudgeResult(
                         term=it.get("term", ""),
@@ -343,15 +506,16 @@ def judge_definitions(
                     )
                 )
 
-        # Log summary
-        try:
-            preview = [
-                {"term": r.get("term"), "verdict": r.get("verdict"), "score": r.get("score")}
-                for r in results[:5]
-            ]
-            _logger.info(f"[judge] parsed {len(results)} results; preview: {preview}")
-        except Exception:
-            pass
+        # Log summary（仅在 INFO 启用时才构造 preview 列表）
+        if _logger.isEnabledFor(logging.INFO):
+            _logger.info(
+                "[judge] parsed %d results; preview: %s",
+                len(results),
+                [
+                    {"term": r.get("term"), "verdict": r.get("verdict"), "score": r.get("score")}
+                    for r in results[:5]
+                ],
+            )
 
         return results
     except Exception as e:
@@ -374,7 +538,7 @@ def judge_definitions(
         return fallback
 
 
-__all__ = ["judge_definitions", "JudgeResult"]
+__all__ = ["judge_definitions", "ijudge_definitions", "JudgeResult"]
 
 # Provide nullcontext for optional context manager without importing contextlib for older Pythons
 try:
@@ -14,39 +14,158 @@ Image to Words Agent using LangGraph
 
 from __future__ import annotations
 
+import asyncio
 import base64
+import functools
+import hashlib
+import io
 import json
 import os
 import re
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, TypedDict
+from typing import Any, AsyncIterator, Dict, List, TypedDict
 
 import dashscope
 from langgraph.graph import END, START, StateGraph
 
 from app.core.logging import get_logger
+from app.services import _term_store
+from app.services._llm_response import (
+    IncrementalArrayParser,
+    extract_text,
+    find_json_array,
+    salvage_json_array,
+    strip_code_fences,
+)
+from app.services._llm_response import loads as _loads
+
+# 可选依赖：Pillow 用于超大图片降采样，缺失时跳过预处理
+try:  # pragma: no cover - optional dependency
+    from PIL import Image as _PILImage
+except Exception:  # pragma: no cover
+    _PILImage = None  # type: ignore
+
+# 可选能力：DashScope OSS上传（旧版SDK可能没有该模块）
+try:  # pragma: no cover - optional SDK capability
+    from dashscope.utils.oss_utils import OssUtils as _OssUtils
+except Exception:  # pragma: no cover
+    _OssUtils = None  # type: ignore
 
 # Initialize logger for this module
 logger = get_logger(__name__)
 
 
+# JSON提取热路径使用的预编译正则
+_DEF_FIELD = re.compile(r'"definition"\s*:\s*"([^"]+)"')
+_EX_FIELD = re.compile(r'"example"\s*:\s*"([^"]+)"')
+
+# 纯文本行兜底：匹配 `term - 释义` / `term: 释义` 形式，
+# 单次 match 同时切出两个字段，避免每行多次 in/split 扫描
+_TERMDEF_RE = re.compile(r"^(?P<term>[A-Za-z][A-Za-z' -]{0,60}?)\s*[-:：]\s*(?P<definition>.+)$")
+# 行提取与去空白/列表符一次完成：免去 splitlines() 的整表分配
+# 和每行两次 strip 的中间字符串
+_LINE_RE = re.compile(r"^[ \t\-•*]*(\S[^\n]*?)[ \t]*$", re.MULTILINE)
+
+
 # 模型名称配置
 # 对于多模态（图片）任务，使用视觉语言模型
 VISION_MODEL = os.getenv("VISION_MODEL", "qwen3-vl-plus")
 # 对于纯文本生成任务，使用文本模型
 TEXT_MODEL = os.getenv("TEXT_MODEL", "qwen3-max-preview")
 
+# 并发调用 DashScope 的上限（避免触发限流）
+DASHSCOPE_MAX_CONCURRENCY = int(os.getenv("DASHSCOPE_MAX_CONCURRENCY", "8"))
+
+# 逐词补全回退路径的并发数（默认与全局上限一致，可单独调低）
+ENRICH_WORKERS = int(os.getenv("ENRICH_WORKERS", str(DASHSCOPE_MAX_CONCURRENCY)))
+
+# 流式流水线：视觉提取与文本补全重叠执行（实验性，默认关闭）。
+# 开启后提取节点边产出条目边进入补全，总耗时从两阶段之和降到
+# 约两者的较大值。
+IMAGES2WORDS_STREAM = os.getenv("IMAGES2WORDS_STREAM", "").lower() in ("1", "true", "yes")
+
+# 超大图片降采样的最长边上限（像素）。视觉模型的耗时与成本随像素数
+# 增长，手机原图降到该尺寸可显著缩小payload。设为 0 或未安装 Pillow
+# 时跳过预处理。
+VISION_MAX_DIM = int(os.getenv("VISION_MAX_DIM", "1536"))
+
+# 超过该字节数的图片改为上传到 DashScope 的临时OSS，消息中只携带
+# oss:// 引用：省掉base64的约33%体积膨胀和SDK内的JSON转义。设为 0
+# 禁用，上传失败时自动回退base64。
+UPLOAD_THRESHOLD = int(os.getenv("IMAGES2WORDS_UPLOAD_THRESHOLD", "102400"))
+
+# 图片提取结果缓存：以图片内容哈希为键的进程内LRU。
+# 用户重传同一张截图/重试时直接复用，省掉整次视觉模型调用。
+# 设为 0 可禁用。
+EXTRACT_CACHE_SIZE = int(os.getenv("IMAGES2WORDS_CACHE_SIZE", "512"))
+_extract_cache: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+_extract_cache_lock = threading.Lock()
+
+# 单词补全结果缓存：词汇重叠度高（常用词占绝大多数），预热后
+# 同一单词不再重复调用文本模型生成释义/例句。设为 0 可禁用。
+ENRICH_CACHE_SIZE = int(os.getenv("ENRICH_CACHE_SIZE", "20000"))
+_enrich_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+_enrich_cache_lock = threading.Lock()
+
+
+def _enrich_cache_get(term: str) -> Dict[str, Any] | None:
+    """查询单词补全缓存，命中时返回副本。"""
+    if ENRICH_CACHE_SIZE <= 0:
+        return None
+    key = (term.lower(), TEXT_MODEL)
+    with _enrich_cache_lock:
+        hit = _enrich_cache.get(key)
+        if hit is not None:
+            _enrich_cache.move_to_end(key)
+            return dict(hit)
+    return None
+
+
+def _enrich_cache_put(term: str, definition: str | None, example: str | None) -> None:
+    """写入单词补全缓存；与已有条目合并，LRU淘汰，并同步持久化。"""
+    if not (definition or example):
+        return
+    # 同步写入持久化词条存储（内部为尽力而为，失败静默）
+    _term_store.put_term(term, definition, example)
+    if ENRICH_CACHE_SIZE <= 0:
+        return
+    key = (term.lower(), TEXT_MODEL)
+    with _enrich_cache_lock:
+        entry = _enrich_cache.get(key) or {}
+        if definition:
+            entry["definition"] = definition
+        if example:
+            entry["example"] = example
+        _enrich_cache[key] = entry
+        _enrich_cache.move_to_end(key)
+        while len(_enrich_cache) > ENRICH_CACHE_SIZE:
+            _enrich_cache.popitem(last=False)
+
 
 class ImageState(TypedDict, total=False):
-    """LangGraph Agent状态定义"""
-    image_bytes: bytes
-    image_base64: str
+    """LangGraph Agent状态定义
+
+    状态中只保留 data_url（MIME + base64），不再携带原始图片字节，
+    避免大图在整个工作流中被重复持有/拷贝；提取节点完成后将
+    data_url 置为 None，提前释放 base64 载荷。
+    """
+    data_url: str | None
     extracted_items: List[Dict[str, Any]]
     completed_items: List[Dict[str, Any]]
 
 
+@functools.lru_cache(maxsize=1)
 def _ensure_api_key() -> str:
-    """确保API密钥已设置"""
+    """确保API密钥已设置
+
+    密钥在进程生命周期内不变，lru_cache 后每个节点调用只剩一次
+    缓存命中，不再重复读取环境变量；异常不会被缓存，配置修复后
+    重试即可生效。
+    """
     api_key = os.getenv("DASHSCOPE_API_KEY", "").strip()
     if not api_key:
         raise ValueError("请设置环境变量 DASHSCOPE_API_KEY")
@@ -56,7 +175,8 @@ def _ensure_api_key() -> str:
 
 def encode_image_to_base64(image_bytes: bytes) -> str:
     """将图片字节编码为base64字符串"""
-    return base64.b64encode(image_bytes).decode("utf-8")
+    # memoryview 避免切片拷贝；base64字母表是纯ASCII，ascii解码更快
+    return base64.b64encode(memoryview(image_bytes)).decode("ascii")
 
 
 def detect_image_format(image_bytes: bytes) -> str:
@@ -69,203 +189,179 @@ def detect_image_format(image_bytes: bytes) -> str:
     Returns:
         MIME类型字符串 (e.g., "image/png", "image/jpeg")
     """
-    if image_bytes.startswith(b'\x89PNG\r\n\x1a\n'):
-        return "image/png"
-    elif image_bytes.startswith(b'\xff\xd8\xff'):
-        return "image/jpeg"
-    elif image_bytes.startswith(b'GIF87a') or image_bytes.startswith(b'GIF89a'):
-        return "image/gif"
-    elif image_bytes.startswith(b'RIFF') and b'WEBP' in image_bytes[:12]:
-        return "image/webp"
-    else:
-        # 默认使用PNG
-        return "image/png"
+    # 按首字节分派，批量场景下每次调用最多做一次完整签名比较
+    first = image_bytes[:1]
+    if first == b'\x89':
+        if image_bytes.startswith(b'\x89PNG\r\n\x1a\n'):
+            return "image/png"
+    elif first == b'\xff':
+        if image_bytes.startswith(b'\xff\xd8\xff'):
+            return "image/jpeg"
+    elif first == b'G':
+        if image_bytes[:6] in (b'GIF87a', b'GIF89a'):
+            return "image/gif"
+    elif first == b'R':
+        # WEBP签名固定在偏移8处，直接等值比较即可，无需子串搜索
+        if image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
+            return "image/webp"
+    # 默认使用PNG
+    return "image/png"
+
+
+def _maybe_downsample(image_bytes: bytes) -> bytes:
+    """超出 VISION_MAX_DIM 的图片降采样并重编码为JPEG，其余原样返回。
+
+    预处理为尽力而为：Pillow 未安装、图片无法解析或重编码反而更大时，
+    均退回原始字节。
+    """
+    if VISION_MAX_DIM <= 0 or _PILImage is None:
+        return image_bytes
+    try:
+        img = _PILImage.open(io.BytesIO(image_bytes))
+        if max(img.size) <= VISION_MAX_DIM:
+            return image_bytes
+        img.thumbnail((VISION_MAX_DIM, VISION_MAX_DIM), _PILImage.LANCZOS)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=85, optimize=True)
+        resized = buf.getvalue()
+        if len(resized) >= len(image_bytes):
+            return image_bytes
+        logger.info(
+            f"[预处理] 图片降采样: {len(image_bytes)} -> {len(resized)} 字节"
+        )
+        return resized
+    except Exception as e:
+        logger.warning(f"[预处理] 图片降采样失败，使用原图: {e}")
+        return image_bytes
 
 
-def extract_text_from_response(response: Any) -> str:
-    """
-    从dashscope响应中提取文本内容
+# 统一的响应文本提取（与 definition_judge_agent 共用）
+extract_text_from_response = extract_text
 
-    支持多种响应格式，包括多模态API的嵌套结构
-    """
-    # 首先尝试常见的属性名
-    for attr in ("output_text", "text", "message", "content"):
-        try:
-            v = getattr(response, attr, None)
-            if isinstance(v, str) and v.strip():
-                return v
-        except Exception:
-            pass
 
-    # 尝试访问 output 属性
-    try:
-        if hasattr(response, "output"):
-            output = response.output
-            # 尝试 choices 格式
-            choices = getattr(output, "choices", None)
-            if choices and len(choices) > 0:
-                choice = choices[0]
-                message = getattr(choice, "message", None)
-                if message:
-                    content = getattr(message, "content", None)
-                    # 处理 content 是数组的情况（dashscope 多模态格式）
-                    if isinstance(content, list) and len(content) > 0:
-                        for item in content:
-                            if isinstance(item, dict) and "text" in item:
-                                text = item["text"]
-                                if isinstance(text, str) and text.strip():
-                                    return text
-                            elif isinstance(item, str) and item.strip():
-                                return item
-                    elif isinstance(content, str) and content.strip():
-                        return content
-            # 尝试直接访问 text
-            text = getattr(output, "text", None)
-            if isinstance(text, str) and text.strip():
-                return text
-            # 如果 output 是字典
-            if isinstance(output, dict):
-                if "choices" in output and output["choices"]:
-                    choice = output["choices"][0]
-                    if isinstance(choice, dict):
-                        message = choice.get("message", {})
-                        if isinstance(message, dict):
-                            content = message.get("content")
-                            if isinstance(content, list) and len(content) > 0:
-                                for item in content:
-                                    if isinstance(item, dict) and "text" in item:
-                                        text = item["text"]
-                                        if isinstance(text, str) and text.strip():
-                                            return text
-                                    elif isinstance(item, str) and item.strip():
-                                        return item
-                            elif isinstance(content, str) and content.strip():
-                                return content
-                if "text" in output:
-                    text = output["text"]
-                    if isinstance(text, str) and text.strip():
-                        return text
-    except Exception:
-        pass
-
-    # 尝试字典格式
-    try:
-        if isinstance(response, dict):
-            out = response.get("output") or {}
-            if isinstance(out, dict):
-                # 先尝试 choices 路径（多模态格式）
-                if "choices" in out and out["choices"]:
-                    choice = out["choices"][0]
-                    if isinstance(choice, dict):
-                        message = choice.get("message", {})
-                        if isinstance(message, dict):
-                            content = message.get("content")
-                            if isinstance(content, list) and len(content) > 0:
-                                for item in content:
-                                    if isinstance(item, dict) and "text" in item:
-                                        text = item["text"]
-                                        if isinstance(text, str) and text.strip():
-                                            return text
-                                    elif isinstance(item, str) and item.strip():
-                                        return item
-                            elif isinstance(content, str) and content.strip():
-                                return content
-                # 尝试直接获取 text
-                text = out.get("text") or out.get("content")
-                if isinstance(text, str) and text.strip():
-                    return text
-            # OpenAI 风格的格式
-            choices = response.get("choices") or []
-            if choices:
-                c0 = choices[0]
-                if isinstance(c0, dict):
-                    message = c0.get("message") or {}
-                    if isinstance(message, dict):
-                        content = message.get("content")
-                        if isinstance(content, list) and len(content) > 0:
-                            for item in content:
-                                if isinstance(item, dict) and "text" in item:
-                                    text = item["text"]
-                                    if isinstance(text, str) and text.strip():
-                                        return text
-                                elif isinstance(item, str) and item.strip():
-                                    return item
-                        elif isinstance(content, str) and content.strip():
-                            return content
-            # 直接包含 text
-            if "text" in response:
-                text = response["text"]
-                if isinstance(text, str) and text.strip():
-                    return text
-    except Exception:
-        pass
-
-    # 最后尝试转换为字符串
-    return str(response)
-
-
-def node_extract_words(state: ImageState) -> ImageState:
-    """
-    LangGraph节点1：从图片中提取单词信息
+async def _acall_generation(prompt: str) -> Any:
+    """异步文本生成调用；优先走 SDK 原生异步接口，缺失时退到线程池。"""
+    aio = getattr(dashscope, "AioGeneration", None)
+    if aio is not None:
+        return await aio.call(model=TEXT_MODEL, prompt=prompt)
+    return await asyncio.to_thread(dashscope.Generation.call, model=TEXT_MODEL, prompt=prompt)
 
-    使用视觉语言模型识别图片中的所有英语单词，
-    并尝试提供释义和例句。
-    """
-    _ensure_api_key()
-    image_base64 = state["image_base64"]
 
-    system_prompt = (
-        "你是一个专业的英语词汇识别专家。"
-        "你的任务是从图片中识别出所有英语单词，并提供每个单词的释义和例句。"
-        "只输出数据，不要添加任何解释性文字。"
-    )
+def _normalize_raw_items(items: Any) -> List[Dict[str, Any]]:
+    """把模型返回的原始条目规范化为 {term, definition, example} 列表。"""
+    normalized: List[Dict[str, Any]] = []
+    if not isinstance(items, list):
+        return normalized
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        raw = item.get("term") or item.get("word")
+        if not isinstance(raw, str):
+            continue
+        term = raw.strip()
+        if not term:
+            continue
+        # 常见情况下各字段已是字符串，只做类型检查与一次strip，
+        # 不再经过 str()/or 链的额外封装
+        definition = item.get("definition")
+        if isinstance(definition, str):
+            definition = definition.strip() or None
+        else:
+            definition = None
+        example = item.get("example")
+        if isinstance(example, str):
+            example = example.strip() or None
+        else:
+            example = None
+        normalized.append({"term": term, "definition": definition, "example": example})
+    return normalized
 
-    user_prompt = (
-        "请仔细分析这张图片，识别出图片中出现的所有英语单词。\n"
-        "对于每个单词，请提供：\n"
-        "1. 单词本身（term）\n"
-        "2. 中文释义（definition）\n"
-        "3. 英文例句（example）\n\n"
-        "请以JSON数组格式输出，每个元素是一个对象，包含以下字段：\n"
-        "- term: 英语单词（字符串）\n"
-        "- definition: 中文释义（字符串，简洁明了，不超过20字）\n"
-        "- example: 英文例句（字符串，自然流畅）\n\n"
-        "如果图片中没有单词或无法识别，请返回空数组 []。\n"
-        "只输出JSON数组，不要添加任何其他文字、代码块标记或解释。\n\n"
-        "示例格式：\n"
-        '[\n'
-        '  {"term": "meticulous", "definition": "一丝不苟的；细致的", "example": "She kept meticulous notes of every meeting."},\n'
-        '  {"term": "serene", "definition": "宁静的；安详的", "example": "The lake looked serene in the morning light."}\n'
-        ']'
-    )
 
-    # 构建消息 - dashscope多模态API格式
-    image_bytes = state.get("image_bytes")
-    if image_bytes:
-        mime_type = detect_image_format(image_bytes)
-    else:
-        mime_type = "image/png"
+def _salvage_term_lines(text: str) -> List[Dict[str, Any]]:
+    """JSON完全解析失败时的纯文本兜底。
 
-    data_url = f"data:{mime_type};base64,{image_base64}"
-    messages = [
-        {
-            "role": "system",
-            "content": [{"text": system_prompt}]
-        },
+    模型偶尔无视格式要求，输出 `term - 释义` 的列表行。_LINE_RE 在
+    原文本上一趟 finditer 直接捕获去除空白/列表符后的行内容，再用
+    预编译的 _TERMDEF_RE 做一次 match 同时取出词条与释义。
+    """
+    items: List[Dict[str, Any]] = []
+    for line_match in _LINE_RE.finditer(text):
+        m = _TERMDEF_RE.match(line_match[1])
+        if m:
+            items.append({
+                "term": m["term"].strip(),
+                "definition": m["definition"].strip()
+            })
+    return items
+
+
+# 视觉识别提示词：进程常量，导入时构建一次；用户提示词可用
+# LLM_VISION_PROMPT 环境变量覆盖（同样只在导入时读取/strip一次）
+_VISION_SYSTEM_PROMPT = (
+    "你是一个专业的英语词汇识别专家。"
+    "你的任务是从图片中识别出所有英语单词，并提供每个单词的释义和例句。"
+    "只输出数据，不要添加任何解释性文字。"
+)
+
+_VISION_USER_PROMPT = os.getenv("LLM_VISION_PROMPT", "").strip() or (
+    "请仔细分析这张图片，识别出图片中出现的所有英语单词。\n"
+    "对于每个单词，请提供：\n"
+    "1. 单词本身（term）\n"
+    "2. 中文释义（definition）\n"
+    "3. 英文例句（example）\n\n"
+    "请以JSON数组格式输出，每个元素是一个对象，包含以下字段：\n"
+    "- term: 英语单词（字符串）\n"
+    "- definition: 中文释义（字符串，简洁明了，不超过20字）\n"
+    "- example: 英文例句（字符串，自然流畅）\n\n"
+    "如果图片中没有单词或无法识别，请返回空数组 []。\n"
+    "只输出JSON数组，不要添加任何其他文字、代码块标记或解释。\n\n"
+    "示例格式：\n"
+    '[\n'
+    '  {"term": "meticulous", "definition": "一丝不苟的；细致的", "example": "She kept meticulous notes of every meeting."},\n'
+    '  {"term": "serene", "definition": "宁静的；安详的", "example": "The lake looked serene in the morning light."}\n'
+    ']'
+)
+
+# system消息不含图片，同样可整体复用
+_VISION_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": [{"text": _VISION_SYSTEM_PROMPT}]
+}
+
+
+def _build_vision_messages(data_url: str) -> List[Dict[str, Any]]:
+    """构建视觉识别的dashscope多模态消息（普通与流式调用共用）。"""
+    return [
+        _VISION_SYSTEM_MESSAGE,
         {
             "role": "user",
             "content": [
                 {"image": data_url},
-                {"text": user_prompt}
+                {"text": _VISION_USER_PROMPT}
             ]
         }
     ]
 
+
+async def node_extract_words(state: ImageState) -> ImageState:
+    """
+    LangGraph节点1：从图片中提取单词信息
+
+    使用视觉语言模型识别图片中的所有英语单词，
+    并尝试提供释义和例句。
+    """
+    _ensure_api_key()
+    messages = _build_vision_messages(state["data_url"])
+
     try:
-        # 调用dashscope的多模态API
-        response = dashscope.MultiModalConversation.call(
+        # 调用dashscope的多模态API（SDK无原生异步多模态接口，走线程池）
+        response = await asyncio.to_thread(
+            dashscope.MultiModalConversation.call,
             model=VISION_MODEL,
-            messages=messages
+            messages=messages,
+            **_oss_call_kwargs(state["data_url"])
         )
 
         # 检查响应状态
@@ -273,7 +369,7 @@ def node_extract_words(state: ImageState) -> ImageState:
             logger.error(f"[提取节点] API调用失败，状态码: {response.status_code}")
             if hasattr(response, "message"):
                 logger.error(f"[提取节点] 错误信息: {response.message}")
-            return {"extracted_items": []}
+            return {"extracted_items": [], "data_url": None}
 
         # 提取响应文本
         text = extract_text_from_response(response)
@@ -286,50 +382,99 @@ def node_extract_words(state: ImageState) -> ImageState:
             logger.debug(f"[提取节点] 提取的文本前500字符: {text[:500]}")
 
         # 清理文本（移除可能的代码块标记）
-        text = text.strip()
-        if text.startswith("```"):
-            text = re.sub(r"^```(?:json)?\n?", "", text, flags=re.MULTILINE)
-            text = re.sub(r"```$", "", text, flags=re.MULTILINE)
-        text = text.strip()
+        text = strip_code_fences(text)
 
         # 尝试解析JSON
         items = []
         try:
-            data = json.loads(text)
+            data = _loads(text)
             if isinstance(data, list):
                 items = data
             elif isinstance(data, dict) and "items" in data:
                 items = data["items"]
         except json.JSONDecodeError:
-            # 尝试从文本中提取JSON数组
-            match = re.search(r'\[[\s\S]*\]', text)
-            if match:
-                try:
-                    items = json.loads(match.group())
-                except json.JSONDecodeError:
-                    pass
+            # 结构化抢救：修复/截取文本中已闭合的数组元素
+            items = salvage_json_array(text)
+            if not items:
+                # 模型输出了纯文本列表时，按行抢救
+                items = _salvage_term_lines(text)
 
         # 验证和规范化数据
-        extracted_items = []
-        for item in items:
-            if isinstance(item, dict):
-                term = item.get("term") or item.get("word") or ""
-                if term and isinstance(term, str) and term.strip():
-                    extracted_items.append({
-                        "term": term.strip(),
-                        "definition": item.get("definition") or None,
-                        "example": item.get("example") or None
-                    })
+        extracted_items = _normalize_raw_items(items)
 
         logger.info(f"[提取节点] 识别到 {len(extracted_items)} 个单词")
-        return {"extracted_items": extracted_items}
+        # 置空 data_url，提前释放大体积 base64 载荷
+        return {"extracted_items": extracted_items, "data_url": None}
 
     except Exception as e:
         logger.error(f"[提取节点] 错误: {e}", exc_info=True)
-        return {"extracted_items": []}
+        return {"extracted_items": [], "data_url": None}
+
+
+async def _enrich_one(item: Dict[str, Any], semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    """为单个缺失信息的单词生成释义/例句（批量失败后的回退路径）。"""
+    term = item["term"]
+    definition = item["definition"]
+    example = item["example"]
+
+    try:
+        prompt_parts = []
+        if item["need_definition"]:
+            prompt_parts.append("1) 一个简洁的中文释义（不超过20字）")
+        if item["need_example"]:
+            prompt_parts.append("2) 一句自然的英文例句")
+
+        prompt = (
+            f"给定英文单词: {term}\n"
+            f"请补充以下缺失信息:\n" + "\n".join(prompt_parts) + "\n"
+            "仅输出一个JSON对象，不要添加多余文本或代码块。键名固定：\n"
+            "definition: 中文释义；example: 英文例句。\n"
+            "示例: {\"definition\": \"能力；才能\", \"example\": \"She has great ability.\"}"
+        )
+
+        async with semaphore:
+            response = await _acall_generation(prompt)
+
+        text = extract_text_from_response(response)
+        # 清理代码块标记
+        text = strip_code_fences(text)
+
+        # 解析JSON
+        try:
+            gen_data = _loads(text)
+            if isinstance(gen_data, dict):
+                if item["need_definition"] and "definition" in gen_data:
+                    gen_def = gen_data["definition"]
+                    if isinstance(gen_def, str) and gen_def.strip():
+                        definition = gen_def.strip()
+                if item["need_example"] and "example" in gen_data:
+                    gen_ex = gen_data["example"]
+                    if isinstance(gen_ex, str) and gen_ex.strip():
+                        example = gen_ex.strip()
+        except json.JSONDecodeError:
+            # 如果解析失败，尝试从文本中提取
+            if item["need_definition"]:
+                def_match = _DEF_FIELD.search(text)
+                if def_match:
+                    definition = def_match.group(1)
+            if item["need_example"]:
+                ex_match = _EX_FIELD.search(text)
+                if ex_match:
+                    example = ex_match.group(1)
+    except Exception as e2:
+        logger.error(f"[补充节点] 为单词 '{term}' 生成信息时出错: {e2}")
+
+    final_definition = definition.strip() if isinstance(definition, str) and definition else None
+    final_example = example.strip() if isinstance(example, str) and example else None
+    _enrich_cache_put(term, final_definition, final_example)
+    return {
+        "term": term,
+        "definition": final_definition,
+        "example": final_example
+    }
 
 
-def node_complete_info(state: ImageState) -> ImageState:
+async def node_complete_info(state: ImageState) -> ImageState:
     """
     LangGraph节点2：补充缺失的释义和例句
 
@@ -360,6 +505,28 @@ def node_complete_info(state: ImageState) -> ImageState:
         need_definition = not definition or not isinstance(definition, str) or not definition.strip()
         need_example = not example or not isinstance(example, str) or not example.strip()
 
+        # 先查补全缓存，命中的字段无需再请求模型
+        if need_definition or need_example:
+            cached = _enrich_cache_get(term)
+            if cached:
+                if need_definition and cached.get("definition"):
+                    definition = cached["definition"]
+                    need_definition = False
+                if need_example and cached.get("example"):
+                    example = cached["example"]
+                    need_example = False
+
+        # 再查持久化词条存储（跨进程/重启复用历史补全结果）
+        if need_definition or need_example:
+            stored = _term_store.get_term(term)
+            if stored:
+                if need_definition and stored.get("definition"):
+                    definition = stored["definition"]
+                    need_definition = False
+                if need_example and stored.get("example"):
+                    example = stored["example"]
+                    need_example = False
+
         if need_definition or need_example:
             incomplete_items.append({
                 "term": term,
@@ -409,41 +576,36 @@ def node_complete_info(state: ImageState) -> ImageState:
             ']'
         )
 
-        response = dashscope.Generation.call(
-            model=TEXT_MODEL,
-            prompt=batch_prompt
-        )
+        response = await _acall_generation(batch_prompt)
 
         text = extract_text_from_response(response)
-        text = text.strip()
-
         # 清理代码块标记
-        if text.startswith("```"):
-            text = re.sub(r"^```(?:json)?\n?", "", text, flags=re.MULTILINE)
-            text = re.sub(r"```$", "", text, flags=re.MULTILINE)
-        text = text.strip()
+        text = strip_code_fences(text)
 
         # 解析JSON数组
         enriched_data = []
         try:
-            data = json.loads(text)
+            data = _loads(text)
             if isinstance(data, list):
                 enriched_data = data
         except json.JSONDecodeError:
-            # 尝试提取JSON数组
-            match = re.search(r'\[[\s\S]*\]', text)
-            if match:
-                try:
-                    enriched_data = json.loads(match.group())
-                except json.JSONDecodeError:
-                    pass
-
-        # 将批量结果与原始数据合并
-        enriched_dict = {item.get("term", "").lower(): item for item in enriched_data if isinstance(item, dict)}
+            # 结构化抢救：修复/截取文本中已闭合的数组元素
+            enriched_data = salvage_json_array(text)
+
+        # 将批量结果与原始数据合并：每个 term 只做一次小写规范化，
+        # 且只索引本批待补全的词条
+        term_lowers = [item["term"].lower() for item in incomplete_items]
+        wanted = set(term_lowers)
+        enriched_dict = {
+            key: enriched
+            for enriched in enriched_data
+            if isinstance(enriched, dict)
+            for key in (enriched.get("term", "").lower(),)
+            if key in wanted
+        }
 
-        for item in incomplete_items:
+        for item, term_lower in zip(incomplete_items, term_lowers):
             term = item["term"]
-            term_lower = term.lower()
 
             definition = item["definition"]
             example = item["example"]
@@ -460,81 +622,37 @@ def node_complete_info(state: ImageState) -> ImageState:
                     if isinstance(gen_ex, str) and gen_ex.strip():
                         example = gen_ex.strip()
 
+            final_definition = definition.strip() if isinstance(definition, str) and definition else None
+            final_example = example.strip() if isinstance(example, str) and example else None
+            _enrich_cache_put(term, final_definition, final_example)
             complete_items.append({
                 "term": term,
-                "definition": definition.strip() if isinstance(definition, str) and definition else None,
-                "example": example.strip() if isinstance(example, str) and example else None
+                "definition": final_definition,
+                "example": final_example
             })
 
         logger.info(f"[补充节点] 批量完成 {len(incomplete_items)} 个单词的信息补充")
 
     except Exception as e:
-        logger.warning(f"[补充节点] 批量处理失败，回退到逐个处理: {e}")
-        # 回退：逐个处理
-        for item in incomplete_items:
-            term = item["term"]
-            definition = item["definition"]
-            example = item["example"]
-
-            try:
-                prompt_parts = []
-                if item["need_definition"]:
-                    prompt_parts.append("1) 一个简洁的中文释义（不超过20字）")
-                if item["need_example"]:
-                    prompt_parts.append("2) 一句自然的英文例句")
-
-                prompt = (
-                    f"给定英文单词: {term}\n"
-                    f"请补充以下缺失信息:\n" + "\n".join(prompt_parts) + "\n"
-                    "仅输出一个JSON对象，不要添加多余文本或代码块。键名固定：\n"
-                    "definition: 中文释义；example: 英文例句。\n"
-                    "示例: {\"definition\": \"能力；才能\", \"example\": \"She has great ability.\"}"
-                )
-
-                response = dashscope.Generation.call(
-                    model=TEXT_MODEL,
-                    prompt=prompt
-                )
-
-                text = extract_text_from_response(response)
-                text = text.strip()
-
-                # 清理代码块标记
-                if text.startswith("```"):
-                    text = re.sub(r"^```(?:json)?\n?", "", text, flags=re.MULTILINE)
-                    text = re.sub(r"```$", "", text, flags=re.MULTILINE)
-                text = text.strip()
-
-                # 解析JSON
-                try:
-                    gen_data = json.loads(text)
-                    if isinstance(gen_data, dict):
-                        if item["need_definition"] and "definition" in gen_data:
-                            gen_def = gen_data["definition"]
-                            if isinstance(gen_def, str) and gen_def.strip():
-                                definition = gen_def.strip()
-                        if item["need_example"] and "example" in gen_data:
-                            gen_ex = gen_data["example"]
-                            if isinstance(gen_ex, str) and gen_ex.strip():
-                                example = gen_ex.strip()
-                except json.JSONDecodeError:
-                    # 如果解析失败，尝试从文本中提取
-                    if item["need_definition"]:
-                        def_match = re.search(r'"definition"\s*:\s*"([^"]+)"', text)
-                        if def_match:
-                            definition = def_match.group(1)
-                    if item["need_example"]:
-                        ex_match = re.search(r'"example"\s*:\s*"([^"]+)"', text)
-                        if ex_match:
-                            example = ex_match.group(1)
-            except Exception as e2:
-                logger.error(f"[补充节点] 为单词 '{term}' 生成信息时出错: {e2}")
-
-            complete_items.append({
-                "term": term,
-                "definition": definition.strip() if isinstance(definition, str) and definition else None,
-                "example": example.strip() if isinstance(example, str) and example else None
-            })
+        logger.warning(f"[补充节点] 批量处理失败，回退到并发逐个处理: {e}")
+        # 回退：逐个处理（并发发起，信号量限流，整体约一个RTT）
+        semaphore = asyncio.Semaphore(max(1, min(ENRICH_WORKERS, len(incomplete_items))))
+        enriched = await asyncio.gather(
+            *(_enrich_one(item, semaphore) for item in incomplete_items),
+            return_exceptions=True,
+        )
+        for item, res in zip(incomplete_items, enriched):
+            if isinstance(res, BaseException):
+                logger.error(f"[补充节点] 为单词 '{item['term']}' 生成信息时出错: {res}")
+                definition = item["definition"]
+                example = item["example"]
+                complete_items.append({
+                    "term": item["term"],
+                    "definition": definition.strip() if isinstance(definition, str) and definition else None,
+                    "example": example.strip() if isinstance(example, str) and example else None
+                })
+            else:
+                complete_items.append(res)
 
     logger.info(f"[补充节点] 完成 {len(complete_items)} 个单词的信息补充")
     return {"completed_items": complete_items}
@@ -562,6 +680,258 @@ def build_agent_graph() -> StateGraph:
     return graph.compile()
 
 
+# 编译后的工作流无状态，进程内只构建/编译一次
+_GRAPH = None
+_graph_lock = threading.Lock()
+
+
+def _get_graph():
+    """懒加载模块级已编译图（双重检查加锁）。"""
+    global _GRAPH
+    if _GRAPH is None:
+        with _graph_lock:
+            if _GRAPH is None:
+                _GRAPH = build_agent_graph()
+    return _GRAPH
+
+
+# 流式流水线的结束哨兵
+_STREAM_DONE = object()
+
+
+async def _stream_extract_to_queue(data_url: str, queue: "asyncio.Queue") -> None:
+    """生产者：流式视觉调用，每解析出一个闭合条目即放入队列。"""
+    loop = asyncio.get_running_loop()
+    parser = IncrementalArrayParser()
+    messages = _build_vision_messages(data_url)
+
+    def _produce() -> None:
+        responses = dashscope.MultiModalConversation.call(
+            model=VISION_MODEL,
+            messages=messages,
+            stream=True,
+            incremental_output=True,
+            **_oss_call_kwargs(data_url),
+        )
+        for response in responses:
+            # default="" 避免空增量chunk走到 str(response) 兜底
+            delta = extract_text_from_response(response, default="")
+            if not delta:
+                continue
+            for obj in parser.feed(delta):
+                loop.call_soon_threadsafe(queue.put_nowait, obj)
+
+    try:
+        # SDK的流式接口是同步生成器，在线程中消费，逐条回投事件循环
+        await asyncio.to_thread(_produce)
+    except Exception as e:
+        logger.error(f"[流式提取] 视觉流式调用失败: {e}", exc_info=True)
+    finally:
+        queue.put_nowait(_STREAM_DONE)
+
+
+async def _await_enrichment(task: "asyncio.Task", item: Dict[str, Any]) -> Dict[str, Any]:
+    """等待单条补全任务；失败时回退为条目的已有字段。"""
+    try:
+        return await task
+    except Exception as e:
+        logger.error(f"[流式补全] 为单词 '{item['term']}' 生成信息时出错: {e}")
+        definition = item["definition"]
+        example = item["example"]
+        return {
+            "term": item["term"],
+            "definition": definition.strip() if isinstance(definition, str) and definition else None,
+            "example": example.strip() if isinstance(example, str) and example else None
+        }
+
+
+async def _iter_streaming_pipeline(data_url: str) -> AsyncIterator[Dict[str, Any]]:
+    """提取/补全重叠执行：视觉模型还在产出时，已闭合的条目即进入补全。
+
+    按提取顺序逐条产出完整条目：信息完整（或缓存命中）的词立刻
+    yield，需要补全的词在其补全任务结束后 yield。各条目的补全失败
+    只影响自身（回退为已有字段），与图路径的语义保持一致。
+    """
+    _ensure_api_key()
+    queue: "asyncio.Queue" = asyncio.Queue()
+    producer = asyncio.create_task(_stream_extract_to_queue(data_url, queue))
+    semaphore = asyncio.Semaphore(max(1, ENRICH_WORKERS))
+
+    # 有序待产出队列：("ready", item) 或 ("task", task, item)
+    entries: deque = deque()
+    while True:
+        obj = await queue.get()
+        if obj is _STREAM_DONE:
+            break
+        term = obj.get("term") or obj.get("word") or ""
+        if not isinstance(term, str) or not term.strip():
+            continue
+        term = term.strip()
+        definition = obj.get("definition")
+        example = obj.get("example")
+        need_definition = not (isinstance(definition, str) and definition.strip())
+        need_example = not (isinstance(example, str) and example.strip())
+
+        # 与补全节点一致：先查进程内LRU，再查持久化词条存储
+        if need_definition or need_example:
+            for probe in (_enrich_cache_get(term), _term_store.get_term(term)):
+                if not probe:
+                    continue
+                if need_definition and probe.get("definition"):
+                    definition = probe["definition"]
+                    need_definition = False
+                if need_example and probe.get("example"):
+                    example = probe["example"]
+                    need_example = False
+
+        if need_definition or need_example:
+            item = {
+                "term": term,
+                "definition": definition,
+                "example": example,
+                "need_definition": need_definition,
+                "need_example": need_example,
+            }
+            entries.append(("task", asyncio.create_task(_enrich_one(item, semaphore)), item))
+        else:
+            entries.append(("ready", {
+                "term": term,
+                "definition": definition.strip() if isinstance(definition, str) else None,
+                "example": example.strip() if isinstance(example, str) else None
+            }, None))
+
+        # 尽早产出：队首已就绪（或任务已完成）的条目无需等待后续
+        while entries:
+            kind, payload, item = entries[0]
+            if kind == "task" and not payload.done():
+                break
+            entries.popleft()
+            yield payload if kind == "ready" else await _await_enrichment(payload, item)
+
+    await producer
+    for kind, payload, item in entries:
+        yield payload if kind == "ready" else await _await_enrichment(payload, item)
+
+
+async def _run_streaming_pipeline(data_url: str) -> List[Dict[str, Any]]:
+    """流式流水线的批量形式：收集全部条目后一次返回。"""
+    items = [item async for item in _iter_streaming_pipeline(data_url)]
+    logger.info(f"[流式流水线] 完成 {len(items)} 个单词的提取与补全")
+    return items
+
+
+async def _run_agent(initial_state: ImageState) -> ImageState:
+    """执行提取+补全：默认走编译图；开启流式流水线时两阶段重叠。"""
+    if IMAGES2WORDS_STREAM:
+        items = await _run_streaming_pipeline(initial_state["data_url"])
+        return {"completed_items": items}
+    return await _get_graph().ainvoke(initial_state)
+
+
+def _extract_cache_get(cache_key: tuple) -> List[Dict[str, Any]] | None:
+    """查询图片提取缓存，命中时返回各条目的副本。"""
+    if EXTRACT_CACHE_SIZE <= 0:
+        return None
+    with _extract_cache_lock:
+        cached = _extract_cache.get(cache_key)
+        if cached is not None:
+            _extract_cache.move_to_end(cache_key)
+            logger.info("[缓存] 命中图片提取缓存，跳过模型调用")
+            return [dict(item) for item in cached]
+    return None
+
+
+def _extract_cache_put(cache_key: tuple, completed_items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """写入图片提取缓存（LRU淘汰最久未使用的条目），返回待交付的结果。"""
+    if EXTRACT_CACHE_SIZE <= 0 or not completed_items:
+        return completed_items
+    with _extract_cache_lock:
+        _extract_cache[cache_key] = completed_items
+        _extract_cache.move_to_end(cache_key)
+        while len(_extract_cache) > EXTRACT_CACHE_SIZE:
+            _extract_cache.popitem(last=False)
+    return [dict(item) for item in completed_items]
+
+
+# OSS上传时临时文件需要正确的后缀（服务端按后缀推断content-type）
+_MIME_SUFFIX = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+
+def _upload_image_ref(image_bytes: bytes, mime_type: str) -> str | None:
+    """大图上传到DashScope临时OSS，返回 oss:// 引用；失败返回 None。
+
+    上传为尽力而为：SDK缺少OSS模块、未达阈值或上传出错时返回 None，
+    调用方回退到base64 data URL。
+    """
+    if _OssUtils is None or UPLOAD_THRESHOLD <= 0 or len(image_bytes) <= UPLOAD_THRESHOLD:
+        return None
+    tmp_path = None
+    try:
+        api_key = _ensure_api_key()
+        with tempfile.NamedTemporaryFile(
+            suffix=_MIME_SUFFIX.get(mime_type, ".png"), delete=False
+        ) as f:
+            f.write(image_bytes)
+            tmp_path = f.name
+        ref = _OssUtils.upload(model=VISION_MODEL, file_path=tmp_path, api_key=api_key)
+        # 1.25.x 起返回 (oss_url, upload_certificate) 元组，旧版SDK返回纯字符串
+        if isinstance(ref, tuple):
+            ref = ref[0] if ref else None
+        if isinstance(ref, str) and ref.startswith("oss://"):
+            return ref
+        logger.warning(f"[图片上传] OSS上传返回了无法识别的结果，回退base64: {ref!r}")
+        return None
+    except Exception as e:
+        logger.warning(f"[图片上传] OSS上传失败，回退base64: {e}")
+        return None
+    finally:
+        if tmp_path:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+def _oss_call_kwargs(*refs: str) -> Dict[str, Any]:
+    """消息携带 oss:// 引用时的额外调用参数。
+
+    SDK只在自己完成上传时才附加解析头，这里自带引用需显式声明。
+    """
+    if any(ref.startswith("oss://") for ref in refs):
+        return {"headers": {"X-DashScope-OssResourceResolve": "enable"}}
+    return {}
+
+
+def _build_initial_state(image_bytes: bytes) -> ImageState:
+    """构建图的初始状态：MIME检测与图片引用只构建一次，不保留原始字节。"""
+    image_bytes = _maybe_downsample(image_bytes)
+    mime_type = detect_image_format(image_bytes)
+    # 大图优先走OSS引用，消息体只有几十字节
+    ref = _upload_image_ref(image_bytes, mime_type)
+    if ref is not None:
+        return {"data_url": ref}
+    # 全程按 bytes 拼接，只在最后解码一次，省掉一个 ~1.33x 原图大小的中间 str
+    prefix = f"data:{mime_type};base64,".encode("ascii")
+    data_url = (prefix + base64.b64encode(image_bytes)).decode("ascii")
+    # 其余字段由各节点按需写入
+    return {"data_url": data_url}
+
+
+def _cache_key_for(image_bytes: bytes) -> tuple:
+    """内容寻址缓存键：同一张图片（同一模型配置）映射到同一条目。
+
+    blake2b 比 sha256 快约一倍且是纯软件实现的最快稳定哈希之一；
+    16字节摘要对进程内缓存键已绰绰有余，且直接用 digest 字节，
+    省掉 hexdigest 的转换。
+    """
+    return (hashlib.blake2b(image_bytes, digest_size=16).digest(), VISION_MODEL, TEXT_MODEL)
+
+
 def extract_vocabulary_from_image(image_path: str | Path | bytes) -> List[Dict[str, Any]]:
     """
     处理图片，返回单词列表
@@ -585,19 +955,170 @@ def extract_vocabulary_from_image(image_path: str | Path | bytes) -> List[Dict[s
             raise FileNotFoundError(f"图片文件不存在: {image_path}")
         image_bytes = image_path.read_bytes()
 
-    image_base64 = encode_image_to_base64(image_bytes)
+    cache_key = _cache_key_for(image_bytes)
+    cached = _extract_cache_get(cache_key)
+    if cached is not None:
+        return cached
 
-    # 初始化状态
-    initial_state: ImageState = {
-        "image_bytes": image_bytes,
-        "image_base64": image_base64,
-        "extracted_items": [],
-        "completed_items": []
-    }
+    initial_state = _build_initial_state(image_bytes)
+
+    # 运行agent（节点均为异步）
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        result = asyncio.run(_run_agent(initial_state))
+    else:
+        # 在事件循环线程中被同步调用时，退到独立线程执行，避免阻塞报错
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            result = pool.submit(asyncio.run, _run_agent(initial_state)).result()
+
+    completed_items = result.get("completed_items", [])
+    return _extract_cache_put(cache_key, completed_items)
+
+
+async def extract_vocabulary_from_image_async(image_path: str | Path | bytes) -> List[Dict[str, Any]]:
+    """
+    extract_vocabulary_from_image 的异步版本
+
+    文件读取通过 asyncio.to_thread 下放到线程池，模型调用直接
+    await 图的 ainvoke，全程不阻塞事件循环——供 FastAPI 异步
+    处理器使用。
+
+    Raises:
+        FileNotFoundError: 当图片文件不存在时
+        ValueError: 当API密钥未设置时
+    """
+    if isinstance(image_path, bytes):
+        image_bytes = image_path
+    else:
+        image_path = Path(image_path)
+        if not image_path.exists():
+            raise FileNotFoundError(f"图片文件不存在: {image_path}")
+        image_bytes = await asyncio.to_thread(image_path.read_bytes)
+
+    cache_key = _cache_key_for(image_bytes)
+    cached = _extract_cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    initial_state = _build_initial_state(image_bytes)
+    result = await _run_agent(initial_state)
+
+    completed_items = result.get("completed_items", [])
+    return _extract_cache_put(cache_key, completed_items)
+
+
+async def stream_vocabulary_from_image(image_path: str | Path | bytes) -> AsyncIterator[Dict[str, Any]]:
+    """
+    extract_vocabulary_from_image_async 的流式版本：逐条产出单词
+
+    视觉模型按流式输出，每闭合一个JSON对象即进入补全并尽早 yield，
+    调用方（如SSE接口）无需等待整张图片处理完。产出顺序与提取顺序
+    一致；全部产出后写入提取缓存，缓存命中时直接逐条产出缓存结果。
+
+    Raises:
+        FileNotFoundError: 当图片文件不存在时
+        ValueError: 当API密钥未设置时
+    """
+    if isinstance(image_path, bytes):
+        image_bytes = image_path
+    else:
+        image_path = Path(image_path)
+        if not image_path.exists():
+            raise FileNotFoundError(f"图片文件不存在: {image_path}")
+        image_bytes = await asyncio.to_thread(image_path.read_bytes)
+
+    cache_key = _cache_key_for(image_bytes)
+    cached = _extract_cache_get(cache_key)
+    if cached is not None:
+        for item in cached:
+            yield item
+        return
+
+    initial_state = _build_initial_state(image_bytes)
+    collected: List[Dict[str, Any]] = []
+    async for item in _iter_streaming_pipeline(initial_state["data_url"]):
+        collected.append(item)
+        yield dict(item)
+    _extract_cache_put(cache_key, collected)
+
+
+async def extract_vocabulary_from_images_async(images: List[bytes]) -> List[List[Dict[str, Any]]]:
+    """
+    一次多模态调用处理多张图片，按输入顺序返回各图的单词列表。
+
+    N 张图只付一次HTTP往返和一份系统提示词的token；要求模型输出
+    N 个子数组组成的顶层JSON数组。与单图流程不同，这里只做提取，
+    不再为缺失字段补全释义/例句。
+    """
+    if not images:
+        return []
+    _ensure_api_key()
 
-    # 运行agent
-    graph = build_agent_graph()
-    result = graph.invoke(initial_state)
+    content: List[Dict[str, Any]] = []
+    image_refs: List[str] = []
+    for image_bytes in images:
+        ref = _build_initial_state(image_bytes)["data_url"]
+        image_refs.append(ref)
+        content.append({"image": ref})
+    n = len(images)
+    content.append({"text": (
+        f"以上共有 {n} 张图片。请按图片顺序，分别识别每张图片中出现的所有英语单词。\n"
+        "输出一个顶层JSON数组，其中恰好包含 "
+        f"{n} 个子数组；第 i 个子数组对应第 i 张图片。\n"
+        "子数组中的每个元素为一个对象，字段：\n"
+        "- term: 英语单词（字符串）\n"
+        "- definition: 中文释义（字符串，简洁明了，不超过20字）\n"
+        "- example: 英文例句（字符串，自然流畅）\n\n"
+        "某张图片没有单词时，对应子数组为 []。\n"
+        "只输出JSON数组，不要添加任何其他文字、代码块标记或解释。"
+    )})
+
+    messages = [
+        _VISION_SYSTEM_MESSAGE,
+        {"role": "user", "content": content},
+    ]
 
-    # 返回结果
-    return result.get("completed_items", [])
+    response = await asyncio.to_thread(
+        dashscope.MultiModalConversation.call,
+        model=VISION_MODEL,
+        messages=messages,
+        **_oss_call_kwargs(*image_refs)
+    )
+
+    if hasattr(response, "status_code") and response.status_code != 200:
+        logger.error(f"[批量提取] API调用失败，状态码: {response.status_code}")
+        return [[] for _ in images]
+
+    text = strip_code_fences(extract_text_from_response(response))
+    data: Any = None
+    try:
+        data = _loads(text)
+    except json.JSONDecodeError:
+        blob = find_json_array(text)
+        if blob is not None:
+            try:
+                data = _loads(blob)
+            except json.JSONDecodeError:
+                data = None
+    if not isinstance(data, list):
+        logger.warning("[批量提取] 响应无法解析为数组，返回空结果")
+        return [[] for _ in images]
+
+    results: List[List[Dict[str, Any]]] = []
+    for i in range(n):
+        sub = data[i] if i < len(data) else []
+        results.append(_normalize_raw_items(sub))
+    logger.info(f"[批量提取] {n} 张图片共识别 {sum(len(r) for r in results)} 个单词")
+    return results
+
+
+def extract_vocabulary_from_images(images: List[bytes]) -> List[List[Dict[str, Any]]]:
+    """extract_vocabulary_from_images_async 的同步封装。"""
+    coro = extract_vocabulary_from_images_async(images)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
@@ -3,43 +3,88 @@ from __future__ import annotations
 import csv
 import io
 import json
-from typing import Iterable, List, Dict
+from typing import Iterable, Iterator, List, Dict
+
+# 可选依赖：orjson 直接消费 bytes，解析比标准库快数倍
+try:  # pragma: no cover - optional dependency
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover
+    _loads = json.loads
+
+# 可选依赖：ijson 流式解析大JSON文件，无需整树物化
+try:  # pragma: no cover - optional dependency
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+# 超过该大小的JSON文件走 ijson 流式解析（如已安装）
+_STREAM_JSON_THRESHOLD = 1 << 20
 
 
 def sniff_and_parse(data: bytes, filename: str | None = None) -> List[Dict[str, str | None]]:
+    return list(iter_sniff_and_parse(data, filename))
+
+
+def iter_sniff_and_parse(data: bytes, filename: str | None = None) -> Iterator[Dict[str, str | None]]:
+    """按文件名嗅探格式并逐条产出词条（流式，调用方可边读边入库）。"""
     name = (filename or "").lower()
     if name.endswith(".json"):
-        return parse_json(data)
-    return parse_csv(data)
+        return iter_parse_json(data)
+    return iter_parse_csv(data)
 
 
 def parse_json(data: bytes) -> List[Dict[str, str | None]]:
-    items = json.loads(data.decode("utf-8"))
-    out: List[Dict[str, str | None]] = []
+    return list(iter_parse_json(data))
+
+
+def iter_parse_json(data: bytes) -> Iterator[Dict[str, str | None]]:
+    if ijson is not None and len(data) > _STREAM_JSON_THRESHOLD:
+        # 大文件流式解析：逐条消费数组元素，峰值内存 O(1)/行
+        items: Iterable = ijson.items(io.BytesIO(data), "item")
+    else:
+        # bytes 直接交给解析器（orjson 原生支持，免去一次整体decode）
+        items = _loads(data)
     for it in items:
         term = it.get("term") or it.get("word")
         definition = it.get("definition") or it.get("meaning")
         example = it.get("example") or it.get("sentence")
         if term:
-            out.append({"term": str(term), "definition": str(definition) if definition else None, "example": str(example) if example else None})
-    return out
+            yield {"term": str(term), "definition": str(definition) if definition else None, "example": str(example) if example else None}
 
 
 def parse_csv(data: bytes) -> List[Dict[str, str | None]]:
+    return list(iter_parse_csv(data))
+
+
+def iter_parse_csv(data: bytes) -> Iterator[Dict[str, str | None]]:
     text = data.decode("utf-8")
-    reader = csv.DictReader(io.StringIO(text))
-    out: List[Dict[str, str | None]] = []
-    for row in reader:
-        # Case-insensitive access
-        keys = {k.lower(): v for k, v in row.items()}
-        term = keys.get("term") or keys.get("word")
-        definition = keys.get("definition") or keys.get("meaning")
-        example = keys.get("example") or keys.get("sentence")
-        if term:
-            out.append({
-                "term": term.strip(),
-                "definition": definition.strip() if definition else None,
-                "example": example.strip() if example else None,
-            })
-    return out
+    reader = csv.reader(io.StringIO(text))
+    try:
+        # Case-insensitive headers, resolved to column indices once
+        header = [h.lower() for h in next(reader)]
+    except StopIteration:
+        return
 
+    def col(*names: str) -> int:
+        for name in names:
+            if name in header:
+                return header.index(name)
+        return -1
+
+    i_term = col("term", "word")
+    i_def = col("definition", "meaning")
+    i_ex = col("example", "sentence")
+
+    for row in reader:
+        n = len(row)
+        term = row[i_term] if 0 <= i_term < n else None
+        if not term:
+            continue
+        definition = row[i_def] if 0 <= i_def < n else None
+        example = row[i_ex] if 0 <= i_ex < n else None
+        yield {
+            "term": term.strip(),
+            "definition": definition.strip() if definition else None,
+            "example": example.strip() if example else None,
+        }
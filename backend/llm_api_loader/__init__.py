@@ -2,5 +2,30 @@
 
 This package provides a thin abstraction around the LLM client used by
 the backend. It is optional and only imported when LLM features are used.
+
+Re-exports resolve lazily via module __getattr__: importing the package
+stays free of the llm_loader -> logging -> SDK import chain until the
+client is actually requested.
 """
 
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover - static analysis only
+    from .llm_loader import QwenClient, load_llm_client
+
+__all__ = ["QwenClient", "load_llm_client"]
+
+
+def __getattr__(name: str):
+    if name in __all__:
+        from . import llm_loader
+
+        value = getattr(llm_loader, name)
+        # Memoize on the module so later accesses are plain dict lookups
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))